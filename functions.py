@@ -1,26 +1,52 @@
 import pygame
-import math
+import functools
+from math import sqrt as _sqrt, hypot as _hypot, ceil as _ceil
+import numpy as np
+from dataclasses import dataclass, field
+from physics_numba import resolve_collisions, find_pairs
 
 pygame.font.init()
 POOL_FONT = pygame.font.SysFont("Arial", 14, bold=True)
 
+_TEXT_CACHE = {}  # Rendered POOL_FONT surfaces keyed by (text, color)
+TEXT_CACHE_LIMIT = 256
+
+def render_text(text, color):
+    """Renders text with POOL_FONT, reusing the surface if it was rendered before."""
+    key = (text, color)
+    surf = _TEXT_CACHE.get(key)
+    if surf is None:
+        if len(_TEXT_CACHE) >= TEXT_CACHE_LIMIT:
+            _TEXT_CACHE.clear()
+        surf = _TEXT_CACHE[key] = POOL_FONT.render(text, True, color).convert_alpha()
+    return surf
+
 BALL_RADIUS = 20
+BALL_RADIUS_SQ = BALL_RADIUS * BALL_RADIUS
 POCKET_RADIUS = 35
+POCKET_R_SQ = POCKET_RADIUS * POCKET_RADIUS
 
-def are_balls_moving(balls, threshold=0.2):
-    """Returns True if any ball has velocity above the threshold."""
-    return any(math.sqrt(b["vel_x"]**2 + b["vel_y"]**2) > threshold for b in balls)
+def max_speed_sq(balls):
+    """Returns the highest squared speed of any ball (0.0 on an empty table)."""
+    if len(balls) == 0:
+        return 0.0
+    return float(np.max(balls.vxs * balls.vxs + balls.vys * balls.vys))
 
+def are_balls_moving(balls, threshold_sq=0.04):
+    """Returns True if any ball's squared speed is above the threshold (0.2² by default)."""
+    return max_speed_sq(balls) > threshold_sq
+
+@functools.lru_cache(maxsize=None)
 def get_pocket_positions(table_x, table_y, table_w, table_h, cushion):
-    """Returns the 6 pocket positions for a standard pool table."""
-    return [
+    """Returns the 6 pocket positions for a standard pool table (cached, the table never moves)."""
+    return (
         (table_x + cushion, table_y + cushion),
         (table_x + table_w // 2, table_y + cushion - 5),
         (table_x + table_w - cushion, table_y + cushion),
         (table_x + cushion, table_y + table_h - cushion),
         (table_x + table_w // 2, table_y + table_h - cushion + 5),
         (table_x + table_w - cushion, table_y + table_h - cushion)
-    ]
+    )
 
 # --- Ball ---
 
@@ -36,221 +62,250 @@ BALL_COLORS = {
     8: (30, 30, 30)    # Black (8-ball)
 }
 
-def create_ball(x, y, number):
-    """Creates a pool ball based on its standard number (0 is the Cue ball)."""
-    radius = BALL_RADIUS
-    
+# Ball type ids (small ints compare faster than strings in the rules code)
+CUE, SOLID, STRIPE, EIGHT = 0, 1, 2, 3
+TYPE_NAMES = {CUE: "CUE", SOLID: "SOLID", STRIPE: "STRIPE", EIGHT: "8 BALL"}
+
+def _ball_style(number):
+    """Returns the (color, type_id) of a pool ball based on its standard number (0 is the Cue ball)."""
     if number == 0:
-        color = (255, 255, 255)
-        ball_type = "cue"
+        return (255, 255, 255), CUE
     elif number == 8:
-        color = BALL_COLORS[8]
-        ball_type = "8ball"
+        return BALL_COLORS[8], EIGHT
     elif number < 8:
-        color = BALL_COLORS[number]
-        ball_type = "solid"
+        return BALL_COLORS[number], SOLID
     else:
         # Stripes use the same colors as solids (9 is Yellow, 10 is Blue, etc.)
-        color = BALL_COLORS[number - 8]
-        ball_type = "stripe"
-        
-    return {
-        "x": x, 
-        "y": y, 
-        "radius": radius, 
-        "color": color,
-        "number": number,
-        "type": ball_type,
-        "dragging": False, 
-        "offset_x": 0, 
-        "offset_y": 0,
-        "vel_x": 0, 
-        "vel_y": 0, 
-        "prev_x": x, 
-        "prev_y": y,
-        "bounce_factor": 0.96, # Coefficient of restitution for ball-ball hits
-        "friction": 0.991,      # Table felt friction per frame
-        "nearby_balls": []
-}
+        return BALL_COLORS[number - 8], STRIPE
+
+CUE_IDX = 0  # The cue ball is racked first and never leaves its slot
 
-def calculate_neighbors(balls):
-    """Finds balls that are close."""
-    for ball in balls:
-        ball["nearby_balls"].clear()
-
-    for i in range(len(balls)):
-        b1 = balls[i]
-        for j in range(i + 1, len(balls)):
-            b2 = balls[j]
-            dx = b2["x"] - b1["x"]
-            dy = b2["y"] - b1["y"]
-            distance_sq = dx**2 + dy**2
-            sum_radii = b1["radius"] + b2["radius"]
-            max_distance = sum_radii + max(b1["radius"], b2["radius"])
-
-            if distance_sq < max_distance**2:
-                b1["nearby_balls"].append(b2)
-                b2["nearby_balls"].append(b1)
-
-def draw_ball(screen, ball):
-    """Draws the pool ball with standard visual rules."""
-    x, y = int(ball["x"]), int(ball["y"])
-    r = int(ball["radius"])
-
-    if ball["type"] == "stripe":
+def _empty(dtype=np.float32):
+    return np.zeros(0, dtype=dtype)
+
+@dataclass
+class BallsSoA:
+    """
+    All balls on the table stored as a Structure-of-Arrays.
+    Ball i is described by index i of every array/list, so physics can run
+    as a few vectorized NumPy operations instead of a per-ball Python loop.
+    Pocketed balls keep their slot with alive=False, so indices never change
+    (the cue ball is always CUE_IDX).
+    """
+    xs: np.ndarray = field(default_factory=_empty)
+    ys: np.ndarray = field(default_factory=_empty)
+    vxs: np.ndarray = field(default_factory=_empty)
+    vys: np.ndarray = field(default_factory=_empty)
+    radii: np.ndarray = field(default_factory=_empty)
+    friction: np.ndarray = field(default_factory=_empty)       # Table felt friction per physics step
+    bounce_factor: np.ndarray = field(default_factory=_empty)  # Coefficient of restitution for ball-ball hits
+    prev_xs: np.ndarray = field(default_factory=_empty)
+    prev_ys: np.ndarray = field(default_factory=_empty)
+    offset_xs: np.ndarray = field(default_factory=_empty)
+    offset_ys: np.ndarray = field(default_factory=_empty)
+    alive: np.ndarray = field(default_factory=lambda: _empty(bool))  # False once pocketed
+    number: np.ndarray = field(default_factory=lambda: _empty(np.int8))
+    type_id: np.ndarray = field(default_factory=lambda: _empty(np.int8))  # CUE, SOLID, STRIPE or EIGHT
+    color: list = field(default_factory=list)
+    drag_idx: int = -1  # Slot of the ball held by the mouse (only one at a time), -1 if none
+
+    def __len__(self):
+        return len(self.number)
+
+    def position(self, i):
+        """Returns the (x, y) position of ball i as plain Python floats."""
+        return float(self.xs[i]), float(self.ys[i])
+
+    def clear(self):
+        """Removes every ball from the table."""
+        self.__init__()
+
+    def extend(self, xs, ys, numbers):
+        """Adds several pool balls at once, allocating each array a single time."""
+        count = len(numbers)
+        xs = np.asarray(xs, dtype=np.float32)
+        ys = np.asarray(ys, dtype=np.float32)
+        zeros = np.zeros(count, dtype=np.float32)
+        self.xs = np.concatenate((self.xs, xs))
+        self.ys = np.concatenate((self.ys, ys))
+        self.vxs = np.concatenate((self.vxs, zeros))
+        self.vys = np.concatenate((self.vys, zeros))
+        self.radii = np.concatenate((self.radii, np.full(count, BALL_RADIUS, dtype=np.float32)))
+        self.friction = np.concatenate((self.friction, np.full(count, 0.991, dtype=np.float32)))
+        self.bounce_factor = np.concatenate((self.bounce_factor, np.full(count, 0.96, dtype=np.float32)))
+        self.prev_xs = np.concatenate((self.prev_xs, xs))
+        self.prev_ys = np.concatenate((self.prev_ys, ys))
+        self.offset_xs = np.concatenate((self.offset_xs, zeros))
+        self.offset_ys = np.concatenate((self.offset_ys, zeros))
+        self.alive = np.concatenate((self.alive, np.ones(count, dtype=bool)))
+        self.number = np.concatenate((self.number, np.asarray(numbers, dtype=np.int8)))
+        styles = [_ball_style(number) for number in numbers]
+        self.type_id = np.concatenate((self.type_id, np.array([t for _, t in styles], dtype=np.int8)))
+        self.color.extend(color for color, _ in styles)
+
+    def index_of(self, number):
+        """Returns the slot of the ball with the given number."""
+        return int(np.flatnonzero(self.number == number)[0])
+
+    def pocket(self, i):
+        """Takes ball i off the table, keeping its slot."""
+        self.alive[i] = False
+        self.vxs[i] = self.vys[i] = 0
+        if i == self.drag_idx:
+            self.drag_idx = -1
+
+    def respawn(self, i, x, y):
+        """Puts ball i back on the table, at rest at (x, y)."""
+        self.alive[i] = True
+        self.xs[i] = self.prev_xs[i] = x
+        self.ys[i] = self.prev_ys[i] = y
+        self.vxs[i] = self.vys[i] = 0
+
+NEIGHBOR_CELL = 3 * BALL_RADIUS  # Must cover the neighbor search radius (sum of radii + largest radius)
+
+def calculate_neighbors(balls, cell=NEIGHBOR_CELL):
+    """
+    Finds balls that are close, only looking at the 3x3 surrounding grid cells.
+    Returns a (K, 2) int32 array of neighbor index pairs (i, j) with i < j.
+    """
+    return find_pairs(balls.xs, balls.ys, balls.radii, balls.alive, np.float32(cell))
+
+BALL_SPRITES = []  # Pre-rendered ball surfaces indexed by ball number, filled by load_ball_sprites()
+
+def _render_ball_sprite(number, r=BALL_RADIUS):
+    """Draws a pool ball with standard visual rules into its own transparent surface."""
+    color, type_id = _ball_style(number)
+    sprite = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+    x, y = r, r
+
+    if type_id == STRIPE:
         # Draw white base
-        pygame.draw.circle(screen, (255, 255, 255), (x, y), r)
+        pygame.draw.circle(sprite, (255, 255, 255), (x, y), r)
         # Draw colored stripe
         stripe_rect = pygame.Rect(x - r + 3, y - r // 2, r * 2 - 6, r)
-        pygame.draw.rect(screen, ball["color"], stripe_rect, border_radius=4)
+        pygame.draw.rect(sprite, color, stripe_rect, border_radius=4)
     else:
         # Draw solid base (for solids, 8-ball, and cue)
-        pygame.draw.circle(screen, ball["color"], (x, y), r)
+        pygame.draw.circle(sprite, color, (x, y), r)
 
     # Draw the white inner circle and number (except for the cue ball)
-    if ball["number"] != 0:
-        pygame.draw.circle(screen, (255, 255, 255), (x, y), r // 2 + 2)
-        text_surf = POOL_FONT.render(str(ball["number"]), True, (0, 0, 0))
+    if number != 0:
+        pygame.draw.circle(sprite, (255, 255, 255), (x, y), r // 2 + 2)
+        text_surf = render_text(str(number), (0, 0, 0))
         text_rect = text_surf.get_rect(center=(x, y))
-        screen.blit(text_surf, text_rect)
+        sprite.blit(text_surf, text_rect)
 
     # Draw a thin dark outline for a clean 2D look
-    pygame.draw.circle(screen, (50, 50, 50), (x, y), r, 2)
+    pygame.draw.circle(sprite, (50, 50, 50), (x, y), r, 2)
+
+    return sprite.convert_alpha()
+
+def load_ball_sprites():
+    """Renders the sprites of all 16 balls once (convert_alpha needs the display mode to be set)."""
+    BALL_SPRITES[:] = [_render_ball_sprite(number) for number in range(16)]
+
+def draw_balls(screen, balls):
+    """Blits every ball still on the table from its pre-rendered sprite, in a single call."""
+    r = BALL_RADIUS
+    alive = balls.alive
+    xs = balls.xs[alive].astype(np.int32).tolist()
+    ys = balls.ys[alive].astype(np.int32).tolist()
+    screen.blits([(BALL_SPRITES[number], (x - r, y - r))
+                  for number, x, y in zip(balls.number[alive].tolist(), xs, ys)], doreturn=False)
 
 # --- Physics ---
 
-def update_inertia(ball):
-    """Calculates throwing velocity based on mouse movement."""
-    if ball["dragging"]:
-        ball["vel_x"] = ball["x"] - ball["prev_x"]
-        ball["vel_y"] = ball["y"] - ball["prev_y"]
-        ball["prev_x"] = ball["x"]
-        ball["prev_y"] = ball["y"]
-
-def apply_physics(ball, dt_multiplier):
-    """Updates position, applies friction, and stops near-zero velocities."""
-    if not ball["dragging"]:
-        ball["x"] += ball["vel_x"] * dt_multiplier
-        ball["y"] += ball["vel_y"] * dt_multiplier
-
-        # Frame-independent friction (applied once per frame)
-        adjusted_friction = ball["friction"] ** dt_multiplier
-        ball["vel_x"] *= adjusted_friction
-        ball["vel_y"] *= adjusted_friction
-
-        # Stop balls that are barely moving
-        speed_sq = ball["vel_x"]**2 + ball["vel_y"]**2
-        if speed_sq < 0.01:  # threshold² = 0.1²
-            ball["vel_x"] = 0
-            ball["vel_y"] = 0
-
-CUSHION_BOUNCE = 0.75  # Energy retained when hitting a cushion
-
-def _collide_with_walls(ball, table_x, table_y, table_w, table_h, cushion):
-    """Resolves wall penetration and reflects velocity off cushions."""
-    left = table_x + cushion + ball["radius"]
-    right = table_x + table_w - cushion - ball["radius"]
-    top = table_y + cushion + ball["radius"]
-    bottom = table_y + table_h - cushion - ball["radius"]
-
-    if ball["x"] < left:
-        ball["x"] = left
-        ball["vel_x"] = abs(ball["vel_x"]) * CUSHION_BOUNCE
-    elif ball["x"] > right:
-        ball["x"] = right
-        ball["vel_x"] = -abs(ball["vel_x"]) * CUSHION_BOUNCE
-
-    if ball["y"] < top:
-        ball["y"] = top
-        ball["vel_y"] = abs(ball["vel_y"]) * CUSHION_BOUNCE
-    elif ball["y"] > bottom:
-        ball["y"] = bottom
-        ball["vel_y"] = -abs(ball["vel_y"]) * CUSHION_BOUNCE
-
-def _collide_with_ball(ball, neighbor):
-    """Resolves collision between two equal-mass pool balls."""
-    dx = neighbor["x"] - ball["x"]
-    dy = neighbor["y"] - ball["y"]
-    distance_sq = dx * dx + dy * dy
-    sum_radii = ball["radius"] + neighbor["radius"]
-
-    if distance_sq >= sum_radii * sum_radii:
-        return  # No collision
-
-    distance = math.sqrt(distance_sq) if distance_sq > 0 else 0.001
-    nx = dx / distance
-    ny = dy / distance
-
-    # Separate overlapping balls (equal mass, split evenly)
-    overlap = sum_radii - distance
-    ball["x"] -= nx * overlap * 0.5
-    ball["y"] -= ny * overlap * 0.5
-    neighbor["x"] += nx * overlap * 0.5
-    neighbor["y"] += ny * overlap * 0.5
-
-    # Relative velocity along collision normal
-    rv_x = ball["vel_x"] - neighbor["vel_x"]
-    rv_y = ball["vel_y"] - neighbor["vel_y"]
-    vel_along_normal = rv_x * nx + rv_y * ny
-
-    # Only resolve if balls are moving toward each other
-    if vel_along_normal <= 0:
-        return
+def update_drag_velocity(balls, steps):
+    """
+    Gives the dragged ball its throwing velocity from the mouse movement since the last update,
+    spread over the number of physics steps that movement took.
+    """
+    i = balls.drag_idx
+    if steps and i >= 0:
+        balls.vxs[i] = (balls.xs[i] - balls.prev_xs[i]) / steps
+        balls.vys[i] = (balls.ys[i] - balls.prev_ys[i]) / steps
+        balls.prev_xs[i] = balls.xs[i]
+        balls.prev_ys[i] = balls.ys[i]
+
+def step_physics(balls):
+    """
+    Advances every ball by one fixed physics step in a few whole-array operations.
+    Free balls move, lose speed to friction and stop once barely moving.
+    """
+    # The dragged ball follows the mouse, so it doesn't move on its own
+    dragged = np.zeros(len(balls), dtype=bool)
+    if balls.drag_idx >= 0:
+        dragged[balls.drag_idx] = True
+    step = (~dragged).astype(np.float32)
+
+    balls.xs += balls.vxs * step
+    balls.ys += balls.vys * step
 
-    # For equal-mass elastic collision: swap the normal components
-    # Apply bounce factor for slight energy loss
-    bounce = ball["bounce_factor"]
-    impulse = vel_along_normal * (1 + bounce) * 0.5
+    decay = np.where(dragged, np.float32(1), balls.friction)
+    balls.vxs *= decay
+    balls.vys *= decay
 
-    ball["vel_x"] -= impulse * nx
-    ball["vel_y"] -= impulse * ny
-    neighbor["vel_x"] += impulse * nx
-    neighbor["vel_y"] += impulse * ny
+    # Stop balls that are barely moving
+    stopped = (balls.vxs * balls.vxs + balls.vys * balls.vys < 0.01) & ~dragged  # threshold² = 0.1²
+    balls.vxs[stopped] = 0
+    balls.vys[stopped] = 0
 
-def check_all_collisions(balls, table_x, table_y, table_w, table_h, cushion):
-    """Resolves all ball-ball and ball-wall overlaps for one sub-step."""
-    for ball in balls:
-        _collide_with_walls(ball, table_x, table_y, table_w, table_h, cushion)
-        for neighbor in ball["nearby_balls"]:
-            if id(ball) < id(neighbor):
-                _collide_with_ball(ball, neighbor)
+def collision_substeps(speed_sq, max_substeps):
+    """
+    Picks how many collision passes a physics step needs: one while the fastest ball moves less
+    than half a radius per step, more as it speeds up.
+    """
+    if speed_sq < (BALL_RADIUS * 0.5)**2:
+        return 1
+    return min(max_substeps, _ceil(2 * _sqrt(speed_sq) / BALL_RADIUS))
+
+def check_all_collisions(balls, pairs, table_x, table_y, table_w, table_h, cushion, substeps=1):
+    """Resolves all ball-ball (from neighbor pairs) and ball-wall overlaps, looping the sub-steps inside the solver."""
+    f32 = np.float32  # float32 scalars keep the kernel in single precision
+    resolve_collisions(balls.xs, balls.ys, balls.vxs, balls.vys, balls.radii, balls.bounce_factor,
+                       pairs, f32(table_x), f32(table_y), f32(table_w), f32(table_h), f32(cushion), substeps)
 
 # --- Mouse ---
 
-def handle_mouse(event, ball):
-    """Handles mouse clicks and movement for dragging the ball."""
+def handle_mouse(event, balls):
+    """Handles mouse clicks and movement for dragging a ball (tracked by balls.drag_idx)."""
     if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
         mouse_x, mouse_y = event.pos
-        distance = math.sqrt((mouse_x - ball["x"])**2 + (mouse_y - ball["y"])**2)
-        if distance <= ball["radius"]:
-            ball["dragging"] = True
-            ball["offset_x"] = ball["x"] - mouse_x
-            ball["offset_y"] = ball["y"] - mouse_y
-            ball["vel_x"] = 0
-            ball["vel_y"] = 0
+        dx = mouse_x - balls.xs
+        dy = mouse_y - balls.ys
+        hit = (dx * dx + dy * dy <= BALL_RADIUS_SQ) & balls.alive
+        if hit.any():
+            i = int(np.argmax(hit))
+            balls.drag_idx = i
+            balls.offset_xs[i] = balls.xs[i] - mouse_x
+            balls.offset_ys[i] = balls.ys[i] - mouse_y
+            balls.vxs[i] = balls.vys[i] = 0
 
     elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
-        ball["dragging"] = False
+        balls.drag_idx = -1
 
     elif event.type == pygame.MOUSEMOTION:
-        if ball["dragging"]:
+        i = balls.drag_idx
+        if i >= 0:
             mouse_x, mouse_y = event.pos
-            ball["x"] = mouse_x + ball["offset_x"]
-            ball["y"] = mouse_y + ball["offset_y"]
+            balls.xs[i] = mouse_x + balls.offset_xs[i]
+            balls.ys[i] = mouse_y + balls.offset_ys[i]
 
 # --- Stick --- 
 
-def draw_cue_stick(screen, cue_ball, mouse_pos, is_charging):
+def draw_cue_stick(screen, cue_pos, mouse_pos, is_charging):
     """Draws the cue stick and returns the shot vector."""
-    dx = cue_ball["x"] - mouse_pos[0]
-    dy = cue_ball["y"] - mouse_pos[1]
-    dist = math.sqrt(dx**2 + dy**2)
+    cue_x, cue_y = cue_pos
+    dx = cue_x - mouse_pos[0]
+    dy = cue_y - mouse_pos[1]
+    dist = _hypot(dx, dy)
     
     if dist == 0: dist = 0.1
     
     # Normalize the direction
-    ux = dx / dist
-    uy = dy / dist
+    inv_dist = 1.0 / dist
+    ux = dx * inv_dist
+    uy = dy * inv_dist
     
     # Stick properties
     stick_length = 400
@@ -260,8 +315,8 @@ def draw_cue_stick(screen, cue_ball, mouse_pos, is_charging):
     offset = 20 + (dist * 0.2 if is_charging else 10) 
     
     # Calculate stick points
-    start_x = cue_ball["x"] - ux * offset
-    start_y = cue_ball["y"] - uy * offset
+    start_x = cue_x - ux * offset
+    start_y = cue_y - uy * offset
     end_x = start_x - ux * stick_length
     end_y = start_y - uy * stick_length
     
@@ -287,29 +342,30 @@ def draw_cue_stick(screen, cue_ball, mouse_pos, is_charging):
 
 # --- Table --- 
 
+@functools.lru_cache(maxsize=None)
+def _pocket_arrays(table_x, table_y, table_w, table_h, cushion):
+    """Returns the pocket x and y coordinates as arrays ready for broadcasting."""
+    pockets = np.array(get_pocket_positions(table_x, table_y, table_w, table_h, cushion), dtype=np.float32)
+    return pockets[:, 0], pockets[:, 1]
+
 def check_pockets(balls, table_x, table_y, table_w, table_h, cushion):
-    """Checks if any ball has fallen into a pocket and returns data of sunk balls."""
-    pockets = get_pocket_positions(table_x, table_y, table_w, table_h, cushion)
-    
-    balls_to_remove = []
-    sunk_data = [] # Track complete data of potted balls
-
-    for ball in balls:
-        for px, py in pockets:
-            dist = math.sqrt((ball["x"] - px)**2 + (ball["y"] - py)**2)
-            if dist < POCKET_RADIUS:
-                balls_to_remove.append(ball)
-                # Store type and number so we can respawn it if needed
-                sunk_data.append({"type": ball["type"], "number": ball["number"]}) 
-                break
-    
-    for ball in balls_to_remove:
-        if ball["number"] == 0:
+    """Checks if any ball has fallen into a pocket and returns (type_id, number) of sunk balls."""
+    px, py = _pocket_arrays(table_x, table_y, table_w, table_h, cushion)
+
+    # Squared distance of every ball (rows) to every pocket (columns)
+    dist_sq = (balls.xs[:, None] - px)**2 + (balls.ys[:, None] - py)**2
+    sunk = (dist_sq < POCKET_R_SQ).any(axis=1) & balls.alive
+    sunk_indices = np.flatnonzero(sunk)
+
+    # Store type and number so we can respawn it if needed
+    sunk_data = [(int(balls.type_id[i]), int(balls.number[i])) for i in sunk_indices]
+
+    for i in sunk_indices:
+        if i == CUE_IDX:
             # Respawn cue ball automatically
-            ball["x"], ball["y"] = table_x + table_w // 4, table_y + table_h // 2
-            ball["vel_x"], ball["vel_y"] = 0, 0
+            balls.respawn(i, table_x + table_w // 4, table_y + table_h // 2)
         else:
-            balls.remove(ball)
+            balls.pocket(i)
             
     return sunk_data
 
@@ -352,7 +408,7 @@ def draw_hud(screen, width, p1_name, p2_name, p1_score, p2_score, current_turn,
     turn_text = f"{p1_name if current_turn == 0 else p2_name}'s Turn"
     turn_color = (0, 100, 255) if current_turn == 0 else (220, 30, 30)
     
-    turn_surf = POOL_FONT.render(turn_text.upper(), True, turn_color)
+    turn_surf = render_text(turn_text.upper(), turn_color)
     turn_rect = turn_surf.get_rect(center=(center_x, header_height // 2))
     screen.blit(turn_surf, turn_rect)
 
@@ -367,7 +423,7 @@ def draw_hud(screen, width, p1_name, p2_name, p1_score, p2_score, current_turn,
     draw_avatar(screen, center_x - x_offset - 70, avatar_y, p1_name, (0, 100, 255), p1_score, p1_active, assigned_types[0])
     draw_avatar(screen, center_x + x_offset, avatar_y, p2_name, (220, 30, 30), p2_score, p2_active, assigned_types[1])  
 
-def draw_avatar(screen, x, y, name, color, score, is_active, ball_type):
+def draw_avatar(screen, x, y, name, color, score, is_active, type_id):
     # Border color: Gold/White if active, Dark if not
     border_color = (255, 215, 0) if is_active else (50, 50, 50)
     border_thickness = 5 if is_active else 2
@@ -377,69 +433,67 @@ def draw_avatar(screen, x, y, name, color, score, is_active, ball_type):
     pygame.draw.rect(screen, border_color, avatar_rect, border_thickness, border_radius=10) 
 
     # Display Ball Type Text (Solid, Stripe, or Open Table)
-    type_text = ball_type.upper() if ball_type else "OPEN TABLE"
-    type_surf = POOL_FONT.render(type_text, True, (180, 180, 180))
+    type_text = TYPE_NAMES[type_id] if type_id is not None else "OPEN TABLE"
+    type_surf = render_text(type_text, (180, 180, 180))
     screen.blit(type_surf, (x, y + 80))
     
     # Name Text
     name_color = (255, 255, 255) if is_active else (150, 150, 150)
-    name_surf = POOL_FONT.render(name, True, name_color)
+    name_surf = render_text(name, name_color)
     screen.blit(name_surf, (x, y - 25))
     
     # Score Box
     score_bg = pygame.Rect(x + 80, y + 15, 60, 40)
     pygame.draw.rect(screen, (20, 20, 30), score_bg, border_radius=5)
-    score_surf = POOL_FONT.render(str(score), True, (255, 255, 255))
+    score_surf = render_text(str(score), (255, 255, 255))
     screen.blit(score_surf, score_surf.get_rect(center=score_bg.center))
 
     # Visual ball indicator if assigned
-    if ball_type:
+    if type_id is not None:
         sample_color = (244, 208, 63) # Yellow for the icon
         ball_x = x + type_surf.get_width() + 15
-        if ball_type == "stripe":
+        if type_id == STRIPE:
             pygame.draw.circle(screen, (255, 255, 255), (ball_x, y + 88), 8)
             pygame.draw.rect(screen, sample_color, (ball_x - 8, y + 84, 16, 8))
         else:
             pygame.draw.circle(screen, sample_color, (ball_x, y + 88), 8)
 
-def draw_aiming_line(screen, cue_ball, balls, mouse_pos, table_x, table_y, table_w, table_h, cushion):
-    """Calculates and draws the aiming guideline and deflection angles."""
-    dx = cue_ball["x"] - mouse_pos[0]
-    dy = cue_ball["y"] - mouse_pos[1]
-    dist = math.sqrt(dx**2 + dy**2)
+def calculate_aiming_line(balls, cue_idx, mouse_pos, table_x, table_y, table_w, table_h, cushion):
+    """
+    Calculates the aiming guideline and deflection angles.
+    Returns the line segments to draw, or None if the mouse is on the cue ball.
+    """
+    cue_x, cue_y = balls.position(cue_idx)
+    dx = cue_x - mouse_pos[0]
+    dy = cue_y - mouse_pos[1]
+    dist = _hypot(dx, dy)
     
     if dist < 0.1: 
-        return
+        return None
 
     # Shooting direction (normalized)
-    ux, uy = dx / dist, dy / dist
-    r = cue_ball["radius"]
+    inv_dist = 1.0 / dist
+    ux, uy = dx * inv_dist, dy * inv_dist
+    r = float(balls.radii[cue_idx])
 
     min_t = float('inf')
     hit_ball = None
 
-    # 1. Check for collisions with other balls
-    for ball in balls:
-        if ball["number"] == 0: 
-            continue # Skip cue ball
-            
-        wx = ball["x"] - cue_ball["x"]
-        wy = ball["y"] - cue_ball["y"]
-        proj = wx * ux + wy * uy
-
-        # If the ball is in front of the ray
-        if proj > 0:
-            cx = cue_ball["x"] + ux * proj
-            cy = cue_ball["y"] + uy * proj
-            dist_sq = (ball["x"] - cx)**2 + (ball["y"] - cy)**2
-
-            # If the ray passes close enough to hit the ball
-            if dist_sq <= (2 * r)**2:
-                offset = math.sqrt((2 * r)**2 - dist_sq)
-                t = proj - offset
-                if 0 < t < min_t:
-                    min_t = t
-                    hit_ball = ball
+    # 1. Check for collisions with other balls (one pass over all balls)
+    # Ray vs. circle of radius 2r around each ball: t^2 - 2*proj*t + c = 0
+    wx = balls.xs - cue_x
+    wy = balls.ys - cue_y
+    proj = wx * ux + wy * uy
+    c = wx * wx + wy * wy - (2 * r)**2
+    disc = proj * proj - c
+    ts = proj - np.sqrt(np.maximum(disc, 0))  # Nearest root is the first contact
+
+    # Balls the ray passes close enough to hit, in front of the cue ball
+    valid = (disc >= 0) & (ts > 0) & balls.alive
+    valid[cue_idx] = False # Skip cue ball
+    if valid.any():
+        hit_ball = int(np.argmin(np.where(valid, ts, np.inf)))
+        min_t = float(ts[hit_ball])
 
     # 2. Check for collisions with walls (cushions)
     bound_left = table_x + cushion + r
@@ -450,11 +504,11 @@ def draw_aiming_line(screen, cue_ball, balls, mouse_pos, table_x, table_y, table
     t_wall_x = float('inf')
     t_wall_y = float('inf')
 
-    if ux > 0: t_wall_x = (bound_right - cue_ball["x"]) / ux
-    elif ux < 0: t_wall_x = (bound_left - cue_ball["x"]) / ux
+    if ux > 0: t_wall_x = (bound_right - cue_x) / ux
+    elif ux < 0: t_wall_x = (bound_left - cue_x) / ux
 
-    if uy > 0: t_wall_y = (bound_bottom - cue_ball["y"]) / uy
-    elif uy < 0: t_wall_y = (bound_top - cue_ball["y"]) / uy
+    if uy > 0: t_wall_y = (bound_bottom - cue_y) / uy
+    elif uy < 0: t_wall_y = (bound_top - cue_y) / uy
 
     t_wall = min(t_wall_x, t_wall_y)
 
@@ -463,42 +517,65 @@ def draw_aiming_line(screen, cue_ball, balls, mouse_pos, table_x, table_y, table
         min_t = t_wall
         hit_ball = None
 
-    # Exact impact point of the cue ball
-    end_x = cue_ball["x"] + ux * min_t
-    end_y = cue_ball["y"] + uy * min_t
+    # Exact impact point of the cue ball (where the ghost ball is drawn)
+    end_x = cue_x + ux * min_t
+    end_y = cue_y + uy * min_t
 
-    # Draw the main aiming line
-    pygame.draw.line(screen, (255, 255, 255), (cue_ball["x"], cue_ball["y"]), (end_x, end_y), 2)
+    aim = {
+        "start": (cue_x, cue_y),
+        "end": (end_x, end_y),
+        "radius": r,
+        "target_line": None,     # (color, start, end) of the hit ball's path
+        "deflection_line": None  # (start, end) of the cue ball's path after impact
+    }
 
-    if hit_ball:
-        # Draw Ghost Ball (Hollow circle)
-        pygame.draw.circle(screen, (255, 255, 255), (int(end_x), int(end_y)), int(r), 1)
+    if hit_ball is not None:
+        hit_x, hit_y = balls.position(hit_ball)
 
         # Calculate target ball direction
-        nx = hit_ball["x"] - end_x
-        ny = hit_ball["y"] - end_y
-        n_dist = math.sqrt(nx**2 + ny**2)
-        if n_dist > 0:
-            nx /= n_dist
-            ny /= n_dist
-
-        # Draw target ball trajectory line
-        target_end_x = hit_ball["x"] + nx * 50
-        target_end_y = hit_ball["y"] + ny * 50
-        pygame.draw.line(screen, hit_ball["color"], (hit_ball["x"], hit_ball["y"]), (target_end_x, target_end_y), 3)
+        nx = hit_x - end_x
+        ny = hit_y - end_y
+        n_dist_sq = nx * nx + ny * ny
+        if n_dist_sq > 0:
+            inv_n_dist = 1.0 / _sqrt(n_dist_sq)
+            nx *= inv_n_dist
+            ny *= inv_n_dist
+
+        # Target ball trajectory line
+        target_end = (hit_x + nx * 50, hit_y + ny * 50)
+        aim["target_line"] = (balls.color[hit_ball], (hit_x, hit_y), target_end)
 
         # Calculate cue ball deflection (Tangent vector)
         dot = ux * nx + uy * ny
         def_x = ux - dot * nx
         def_y = uy - dot * ny
         
-        def_dist = math.sqrt(def_x**2 + def_y**2)
-        if def_dist > 0:
-            def_x /= def_dist
-            def_y /= def_dist
-            cue_end_x = end_x + def_x * 40
-            cue_end_y = end_y + def_y * 40
-            pygame.draw.line(screen, (255, 255, 255), (end_x, end_y), (cue_end_x, cue_end_y), 2)
-    else:
-        # Only hit wall, draw ghost ball there
-        pygame.draw.circle(screen, (255, 255, 255), (int(end_x), int(end_y)), int(r), 1)
\ No newline at end of file
+        def_dist_sq = def_x * def_x + def_y * def_y
+        if def_dist_sq > 0:
+            inv_def_dist = 1.0 / _sqrt(def_dist_sq)
+            def_x *= inv_def_dist
+            def_y *= inv_def_dist
+            aim["deflection_line"] = ((end_x, end_y), (end_x + def_x * 40, end_y + def_y * 40))
+
+    return aim
+
+def draw_aiming_line(screen, aim):
+    """Draws an aiming guideline computed by calculate_aiming_line."""
+    if aim is None:
+        return
+
+    end_x, end_y = aim["end"]
+
+    # Draw the main aiming line
+    pygame.draw.line(screen, (255, 255, 255), aim["start"], aim["end"], 2)
+
+    # Draw Ghost Ball (Hollow circle) where the cue ball ends up
+    pygame.draw.circle(screen, (255, 255, 255), (int(end_x), int(end_y)), int(aim["radius"]), 1)
+
+    if aim["target_line"]:
+        color, start, end = aim["target_line"]
+        pygame.draw.line(screen, color, start, end, 3)
+
+    if aim["deflection_line"]:
+        start, end = aim["deflection_line"]
+        pygame.draw.line(screen, (255, 255, 255), start, end, 2)
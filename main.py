@@ -1,24 +1,40 @@
 import pygame
 import random
+import functools
+import logging
+import numpy as np
 from functions import *
 
 pygame.init()
 
+# Game events are logged at INFO, so they're skipped (message never formatted) during normal play
+logging.basicConfig(level=logging.WARNING, format="%(message)s")
+log = logging.getLogger(__name__)
+
 # --- Window Configurations ---
 WIDTH = 1920
 HEIGHT = 1080
 screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.NOFRAME) 
 pygame.display.set_caption("8-Ball Pool")
 clock = pygame.time.Clock()
-FPS = 120
+RENDER_FPS = 60
+IDLE_FPS = 30  # Frame rate while nothing moves (aiming, menus)
+PHYSICS_DT = 1000 / 120  # Fixed physics step in ms, independent of the frame rate
+MAX_PHYSICS_STEPS = 8    # Cap per frame so a long stall doesn't snowball
 MENU_FONT = pygame.font.SysFont("Arial", 40, bold=True)
 
+@functools.lru_cache(maxsize=64)
+def render_menu_text(text, color):
+    """Renders text with MENU_FONT once per (text, color) and reuses the surface afterwards."""
+    return MENU_FONT.render(text, True, color)
+
 # --- Table Configurations ---
 TABLE_W = 1500
 TABLE_H = 750
 TABLE_X = (WIDTH - TABLE_W) // 2 
 TABLE_Y = 250
 CUSHION_SIZE = 60
+HUD_HEIGHT = 180  # The HUD bar covers this strip at the top of the screen
 
 # --- Colors ---
 BG_COLOR = (25, 30, 45)
@@ -29,7 +45,7 @@ TABLE_COLORS = {
 }
 
 # --- Game State Variables ---
-balls = []
+balls = BallsSoA()
 player_names = ["", ""]
 player_ball_types = [None, None]
 player_scores = [0, 0]
@@ -41,46 +57,75 @@ game_over = False
 game_over_time = 0
 winner_name = ""    
 
+moving = False  # Whether any ball is still rolling (evaluated once per frame)
 shot_taken = False
 charging_shot = False
 balls_sunk_in_shot = []  # Tracks balls pocketed during the current turn
+aim = None               # Cached aiming line, valid while the mouse and balls stay put
+aim_mouse_pos = None     # Mouse position the cached aim was computed for (None = stale)
+physics_acc = 0.0        # Frame time (ms) not yet consumed by fixed physics steps
+was_simulating = False   # Whether physics ran last frame (False = the table was at rest)
 
 MAX_NAME_LENGTH = 12
 GAME_OVER_DELAY_MS = 4000
 MAX_SHOT_POWER = 30
 SHOT_POWER_SCALE = 0.15
+COLLISION_SUBSTEPS = 8  # Upper bound per physics step, slower balls use fewer passes
+MOUSE_BUTTON_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)  # Only these can start/end drags and shots
+
+# Triangle rack: (x, y) offset of every ball from the apex, row by row
+RACK_NUMBERS = [1, 9, 2, 10, 8, 3, 4, 11, 12, 5, 13, 14, 6, 15, 7]
+RACK_OFFSETS = np.array([
+    (row * (BALL_RADIUS * 1.732), (col - row / 2.0) * (BALL_RADIUS * 2.05))
+    for row in range(5)
+    for col in range(row + 1)
+], dtype=np.float32)
+
+# Full opening layout (cue ball first, then the triangle), the table never moves
+OPENING_NUMBERS = [0] + RACK_NUMBERS
+OPENING_POSITIONS = np.vstack((
+    np.array([(TABLE_X + TABLE_W // 4, TABLE_Y + TABLE_H // 2)], dtype=np.float32),
+    RACK_OFFSETS + np.array((TABLE_X + TABLE_W * 0.72, TABLE_Y + TABLE_H // 2), dtype=np.float32),
+))
 
 def setup_rack():
     """Sets up the table with the standard 8-ball triangle."""
     balls.clear()
-    balls.append(create_ball(TABLE_X + TABLE_W // 4, TABLE_Y + TABLE_H // 2, 0)) # Cue Ball
-    rack_numbers = [1, 9, 2, 10, 8, 3, 4, 11, 12, 5, 13, 14, 6, 15, 7]
-    start_x = TABLE_X + TABLE_W * 0.72
-    start_y = TABLE_Y + TABLE_H // 2
-    radius = BALL_RADIUS
-    idx = 0
-    for row in range(5):
-        for col in range(row + 1):
-            x_offset = row * (radius * 1.732)
-            y_offset = (col - row / 2.0) * (radius * 2.05)
-            balls.append(create_ball(start_x + x_offset, start_y + y_offset, rack_numbers[idx]))
-            idx += 1
+    balls.extend(OPENING_POSITIONS[:, 0], OPENING_POSITIONS[:, 1], OPENING_NUMBERS)
 
 setup_rack()
 
+# --- Ball Sprites (all 16 rendered up front, now that the display mode is set) ---
+load_ball_sprites()
+
+# --- Game Over Overlay (constant translucent layer, built once) ---
+GAME_OVER_OVERLAY = pygame.Surface((WIDTH, HEIGHT))
+GAME_OVER_OVERLAY.set_alpha(200)
+GAME_OVER_OVERLAY.fill((10, 10, 15))
+
+# --- HUD Separator (2 px line under the HUD bar, blitted instead of drawn) ---
+HUD_LINE_SURF = pygame.Surface((WIDTH, 2)).convert()
+HUD_LINE_SURF.fill((60, 70, 90))
+
+# --- Static Background (the table never changes, so draw it once) ---
+# Only covers the screen below the HUD, table coordinates are shifted up to match
+BOARD_BG = pygame.Surface((WIDTH, HEIGHT - HUD_HEIGHT)).convert()
+BOARD_BG.fill(BG_COLOR)
+draw_table(BOARD_BG, TABLE_X, TABLE_Y - HUD_HEIGHT, TABLE_W, TABLE_H, CUSHION_SIZE, TABLE_COLORS)
+draw_pockets(BOARD_BG, TABLE_X, TABLE_Y - HUD_HEIGHT, TABLE_W, TABLE_H, CUSHION_SIZE)
+
 # --- Main Game Loop ---
 running = True
 while running:
-    milli = clock.tick(FPS) 
-    dt_multiplier = milli / (1000 / FPS) 
+    # Balls below the "moving" threshold are still simulated, so any speed keeps the full frame rate
+    active = moving or charging_shot or balls.drag_idx >= 0 or max_speed_sq(balls) > 0
+    milli = clock.tick(RENDER_FPS if active else IDLE_FPS)
     mouse_pos = pygame.mouse.get_pos()
-    
-    # Helper variables for this frame
-    cue_ball = balls[0] if len(balls) > 0 and balls[0]["number"] == 0 else None
 
     # ==========================================
     # 1. EVENT HANDLING (Mouse & Keyboard)
     # ==========================================
+    latest_motion = None  # Only the newest MOUSEMOTION of the frame is applied
     for event in pygame.event.get():
         if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
             running = False
@@ -95,6 +140,7 @@ while running:
                 balls_sunk_in_shot.clear()
                 current_player_idx = random.randint(0, 1)
                 setup_rack()
+                aim_mouse_pos = None
         
         # --- Menu Events ---
         elif not game_started:
@@ -107,81 +153,107 @@ while running:
                             current_player_idx = random.randint(0, 1)
                             game_started = True
                             setup_rack()
+                            aim_mouse_pos = None
                 elif event.key == pygame.K_BACKSPACE:
                     player_names[input_active] = player_names[input_active][:-1]
                 else:
                     if len(player_names[input_active]) < MAX_NAME_LENGTH:
                         player_names[input_active] += event.unicode
         # --- Game Events ---
-        else:
-            moving = are_balls_moving(balls)
-            is_dragging = False
-            for ball in balls:
-                was_dragging = ball.get("dragging", False)
-                handle_mouse(event, ball)
-                
-                # Trigger shot logic if a ball was dragged and released
-                if was_dragging and not ball.get("dragging", False):
-                    shot_taken = True 
-                if ball.get("dragging", False):
-                    is_dragging = True
+        elif event.type == pygame.MOUSEMOTION:
+            latest_motion = event
+        elif event.type in MOUSE_BUTTON_EVENTS:
+            # Apply pending motion first so drags stay in order with clicks
+            if latest_motion is not None:
+                handle_mouse(latest_motion, balls)
+                latest_motion = None
+
+            was_dragging = balls.drag_idx >= 0
+            handle_mouse(event, balls)
+            is_dragging = balls.drag_idx >= 0
+
+            # Trigger shot logic if a ball was dragged and released
+            if was_dragging and not is_dragging:
+                shot_taken = True 
 
             # 2. Cue Stick Shooting
-            if not moving and cue_ball and not is_dragging:
+            if not moving and not is_dragging:
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     charging_shot = True
                 elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
                     if charging_shot:
-                        ux, uy, dist = draw_cue_stick(screen, cue_ball, mouse_pos, True)
+                        cue_pos = balls.position(CUE_IDX)
+                        ux, uy, dist = draw_cue_stick(screen, cue_pos, mouse_pos, True)
                         power = min(dist * SHOT_POWER_SCALE, MAX_SHOT_POWER)
-                        cue_ball["vel_x"] = ux * power
-                        cue_ball["vel_y"] = uy * power
+                        balls.vxs[CUE_IDX] = ux * power
+                        balls.vys[CUE_IDX] = uy * power
                         
                         charging_shot = False
                         shot_taken = True
+                        moving = True
                         balls_sunk_in_shot = [] # Reset tracking for the new shot
 
+    if latest_motion is not None:
+        handle_mouse(latest_motion, balls)
+
     # ==========================================
     # 2. GAME LOGIC (Physics & Rules)
     # ==========================================
     if game_started:
-        moving = are_balls_moving(balls)
-        # --- Physics Updates ---
-        for ball in balls:
-            update_inertia(ball)
-            apply_physics(ball, dt_multiplier)
-            
-        # --- Pocket Collisions & Instant UI Updates ---
-        sunk_this_frame = check_pockets(balls, TABLE_X, TABLE_Y, TABLE_W, TABLE_H, CUSHION_SIZE)
-        
-        if sunk_this_frame:
-            for b_data in sunk_this_frame:
-                b_type = b_data["type"]
-                b_num = b_data["number"]
-                balls_sunk_in_shot.append(b_data)
-
-                if b_type in ["solid", "stripe", "8ball"]:
-                    # 1. Assign ball types on first pot
-                    if player_ball_types[current_player_idx] is None:
-                        if b_type == "8ball": 
-                            game_over = True 
-                            winner_name = player_names[1 - current_player_idx]
-                            game_over_time = pygame.time.get_ticks()
-                            break
-                        player_ball_types[current_player_idx] = b_type
-                        player_ball_types[1 - current_player_idx] = "stripe" if b_type == "solid" else "solid"
-                        player_scores[current_player_idx] += 1
-                    
-                    # 2. Score (potted own ball)
-                    elif b_type == player_ball_types[current_player_idx]:
-                        player_scores[current_player_idx] += 1
-                        print(f"SCORE! Player {current_player_idx + 1} scored.")
-                    
-                    # 3. Foul (potted opponent's ball - respawn it)
-                    else:
-                        if b_num != 8: 
-                            mid_x, mid_y = TABLE_X + TABLE_W // 2, TABLE_Y + TABLE_H // 2
-                            balls.append(create_ball(mid_x, mid_y, b_num))
+        # Skip physics entirely while every ball is at rest (e.g. the player is aiming)
+        simulate = max_speed_sq(balls) > 0 or balls.drag_idx >= 0
+        steps = 0
+        if simulate:
+            # Fixed-step accumulator: run as many physics steps as the frame time covers.
+            # Coming out of rest nothing moved during the last frame, so start with a single step
+            physics_acc += milli if was_simulating else PHYSICS_DT
+            steps = min(int(physics_acc // PHYSICS_DT), MAX_PHYSICS_STEPS)
+            physics_acc = min(physics_acc - steps * PHYSICS_DT, PHYSICS_DT)
+            update_drag_velocity(balls, steps)
+            aim_mouse_pos = None
+        else:
+            physics_acc = 0.0
+        was_simulating = simulate
+
+        for _ in range(steps):
+            # --- Physics Updates ---
+            step_physics(balls)
+
+            # --- Pocket Collisions & Instant UI Updates ---
+            sunk_this_step = check_pockets(balls, TABLE_X, TABLE_Y, TABLE_W, TABLE_H, CUSHION_SIZE)
+
+            if sunk_this_step:
+                for b_data in sunk_this_step:
+                    b_type, b_num = b_data
+                    balls_sunk_in_shot.append(b_data)
+
+                    if b_type != CUE:
+                        # 1. Assign ball types on first pot
+                        if player_ball_types[current_player_idx] is None:
+                            if b_type == EIGHT: 
+                                game_over = True 
+                                winner_name = player_names[1 - current_player_idx]
+                                game_over_time = pygame.time.get_ticks()
+                                break
+                            player_ball_types[current_player_idx] = b_type
+                            player_ball_types[1 - current_player_idx] = STRIPE if b_type == SOLID else SOLID
+                            player_scores[current_player_idx] += 1
+
+                        # 2. Score (potted own ball)
+                        elif b_type == player_ball_types[current_player_idx]:
+                            player_scores[current_player_idx] += 1
+                            log.info("SCORE! Player %d scored.", current_player_idx + 1)
+
+                        # 3. Foul (potted opponent's ball - respawn it)
+                        else:
+                            if b_num != 8: 
+                                mid_x, mid_y = TABLE_X + TABLE_W // 2, TABLE_Y + TABLE_H // 2
+                                balls.respawn(balls.index_of(b_num), mid_x, mid_y)
+
+            # --- Ball Collisions ---
+            pairs = calculate_neighbors(balls)
+            substeps = collision_substeps(max_speed_sq(balls), COLLISION_SUBSTEPS)
+            check_all_collisions(balls, pairs, TABLE_X, TABLE_Y, TABLE_W, TABLE_H, CUSHION_SIZE, substeps)
 
         moving = are_balls_moving(balls)
         
@@ -190,22 +262,20 @@ while running:
             foul = False
             sunk_8ball = False
             
-            for b_data in balls_sunk_in_shot:
-                b_type = b_data["type"]
-                
-                if b_type == "cue":
+            for b_type, _ in balls_sunk_in_shot:
+                if b_type == CUE:
                     foul = True
-                elif b_type == "8ball":
+                elif b_type == EIGHT:
                     sunk_8ball = True
                 elif player_ball_types[current_player_idx] == b_type:
                     keep_turn = True
-                elif b_type in ["solid", "stripe"]:
+                else:
                     foul = True # Potted opponent's ball
             
             # --- 8-Ball Rules ---
             if sunk_8ball:
                 my_type = player_ball_types[current_player_idx]
-                my_balls_this_shot = sum(1 for b in balls_sunk_in_shot if b["type"] == my_type)
+                my_balls_this_shot = sum(1 for b_type, _ in balls_sunk_in_shot if b_type == my_type)
                 points_before_shot = player_scores[current_player_idx] - my_balls_this_shot
                 
                 # Clean win: all own balls potted + 8-ball legally
@@ -213,75 +283,67 @@ while running:
                     game_over = True
                     game_over_time = pygame.time.get_ticks()
                     winner_name = player_names[current_player_idx]
-                    print(f"Victory: {winner_name} scored the 8 ball!")
+                    log.info("Victory: %s scored the 8 ball!", winner_name)
                 else:
                     # 8-ball sunk illegally
                     game_over = True
                     game_over_time = pygame.time.get_ticks()
                     winner_name = player_names[1 - current_player_idx]
-                    print(f"Defeat: Illegal move. {winner_name} wins!")
+                    log.info("Defeat: Illegal move. %s wins!", winner_name)
             
             # --- Change turns ---
             if not game_over:
                 if foul or not keep_turn:
                     current_player_idx = 1 - current_player_idx
-                    print(f"Turn: Player turn {current_player_idx + 1}")
+                    log.info("Turn: Player turn %d", current_player_idx + 1)
             
             # End of shot - reset for the next turn
             shot_taken = False 
             balls_sunk_in_shot.clear()
 
-        # --- Ball Collisions ---
-        calculate_neighbors(balls)
-        for _ in range(8):
-            check_all_collisions(balls, TABLE_X, TABLE_Y, TABLE_W, TABLE_H, CUSHION_SIZE)            
-
     # ==========================================
     # 3. RENDERING
     # ==========================================
-    screen.fill(BG_COLOR)
-
     if not game_started:
         # --- Draw Menu ---
+        screen.fill(BG_COLOR)
         txt = f"Player {input_active + 1} Name: {player_names[input_active]}"
-        surf = MENU_FONT.render(txt, True, (255, 255, 255))
+        surf = render_menu_text(txt, (255, 255, 255))
         screen.blit(surf, (WIDTH//2 - 300, HEIGHT//2))
         
-        sub_txt = MENU_FONT.render("Press ENTER to confirm", True, (150, 150, 150))
+        sub_txt = render_menu_text("Press ENTER to confirm", (150, 150, 150))
         screen.blit(sub_txt, (WIDTH//2 - 300, HEIGHT//2 + 60))
         
     else:
         # --- Draw Table & Balls ---
-        draw_table(screen, TABLE_X, TABLE_Y, TABLE_W, TABLE_H, CUSHION_SIZE, TABLE_COLORS)
-        draw_pockets(screen, TABLE_X, TABLE_Y, TABLE_W, TABLE_H, CUSHION_SIZE)
+        screen.blit(BOARD_BG, (0, HUD_HEIGHT))
         
-        for ball in balls:
-            draw_ball(screen, ball)
+        draw_balls(screen, balls)
             
         # --- Draw Cue Stick ---
-        if not moving and cue_ball:
-            draw_aiming_line(screen, cue_ball, balls, mouse_pos, TABLE_X, TABLE_Y, TABLE_W, TABLE_H, CUSHION_SIZE)
-            draw_cue_stick(screen, cue_ball, mouse_pos, charging_shot)
+        if not moving:
+            if mouse_pos != aim_mouse_pos:
+                aim = calculate_aiming_line(balls, CUE_IDX, mouse_pos, TABLE_X, TABLE_Y, TABLE_W, TABLE_H, CUSHION_SIZE)
+                aim_mouse_pos = mouse_pos
+            draw_aiming_line(screen, aim)
+            draw_cue_stick(screen, balls.position(CUE_IDX), mouse_pos, charging_shot)
 
         # --- Draw HUD ---
-        pygame.draw.rect(screen, (15, 20, 30), (0, 0, WIDTH, 180))
-        pygame.draw.line(screen, (60, 70, 90), (0, 180), (WIDTH, 180), 2)
+        screen.fill((15, 20, 30), (0, 0, WIDTH, HUD_HEIGHT))
+        screen.blit(HUD_LINE_SURF, (0, HUD_HEIGHT))
         
         draw_hud(screen, WIDTH, player_names[0], player_names[1], 
                  player_scores[0], player_scores[1], 
                  current_player_idx, player_ball_types)
     
         if game_over:
-            overlay = pygame.Surface((WIDTH, HEIGHT))
-            overlay.set_alpha(200) 
-            overlay.fill((10, 10, 15))
-            screen.blit(overlay, (0, 0))
+            screen.blit(GAME_OVER_OVERLAY, (0, 0))
             
             win_txt = f"{winner_name} Won!"
-            win_surf = MENU_FONT.render(win_txt.upper(), True, (255, 215, 0))
+            win_surf = render_menu_text(win_txt.upper(), (255, 215, 0))
             screen.blit(win_surf, (WIDTH//2 - win_surf.get_width()//2, HEIGHT//2 - 50))
 
-            restart_txt = MENU_FONT.render("Starting new match...", True, (150, 150, 150))
+            restart_txt = render_menu_text("Starting new match...", (150, 150, 150))
             screen.blit(restart_txt, (WIDTH//2 - restart_txt.get_width()//2, HEIGHT//2 + 50))
         
     pygame.display.flip()
@@ -0,0 +1,164 @@
+"""Collision solver compiled with Numba, working directly on the BallsSoA arrays."""
+import math
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional: without it the same kernels run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Constants are float32 so Numba doesn't promote the float32 ball arrays to float64
+CUSHION_BOUNCE = np.float32(0.75)  # Energy retained when hitting a cushion
+ONE = np.float32(1)
+HALF = np.float32(0.5)
+MIN_DISTANCE = np.float32(0.001)   # Stand-in distance for exactly overlapping balls
+
+@njit(cache=True, fastmath=True)
+def _clamp_axis(ps, vs, low, high):
+    """Clamps positions into [low, high] and reflects the velocity of every clamped ball."""
+    clamped = np.minimum(np.maximum(ps, low), high)
+    # +1 when pushed off the low cushion, -1 off the high one, 0 when untouched
+    side = np.sign(clamped - ps)
+    vs[:] = np.where(side == 0, vs, side * np.abs(vs) * CUSHION_BOUNCE)
+    ps[:] = clamped
+
+@njit(cache=True, fastmath=True)
+def collide_walls_vec(xs, ys, vxs, vys, left, right, top, bottom):
+    """
+    Resolves wall penetration and reflects velocity off cushions for all balls, without per-ball branches.
+    left/right/top/bottom: per-ball limits for the ball centre (cushion edge offset by its radius).
+    """
+    _clamp_axis(xs, vxs, left, right)
+    _clamp_axis(ys, vys, top, bottom)
+
+@njit(cache=True, fastmath=True)
+def _collide_with_ball(xs, ys, vxs, vys, radii, bounce_factor, i, j):
+    """Resolves collision between two equal-mass pool balls."""
+    # Read each element once into locals, write back only what changed
+    x1, y1, x2, y2 = xs[i], ys[i], xs[j], ys[j]
+    dx = x2 - x1
+    dy = y2 - y1
+    distance_sq = dx * dx + dy * dy
+    sum_radii = radii[i] + radii[j]
+
+    if distance_sq >= sum_radii * sum_radii:
+        return  # No collision
+
+    distance = math.sqrt(distance_sq) if distance_sq > 0 else MIN_DISTANCE
+    inv_distance = ONE / distance
+    nx = dx * inv_distance
+    ny = dy * inv_distance
+
+    # Separate overlapping balls (equal mass, split evenly)
+    half_overlap = (sum_radii - distance) * HALF
+    xs[i] = x1 - nx * half_overlap
+    ys[i] = y1 - ny * half_overlap
+    xs[j] = x2 + nx * half_overlap
+    ys[j] = y2 + ny * half_overlap
+
+    # Relative velocity along collision normal
+    vx1, vy1, vx2, vy2 = vxs[i], vys[i], vxs[j], vys[j]
+    vel_along_normal = (vx1 - vx2) * nx + (vy1 - vy2) * ny
+
+    # Only resolve if balls are moving toward each other
+    if vel_along_normal <= 0:
+        return
+
+    # For equal-mass elastic collision: swap the normal components
+    # Apply bounce factor for slight energy loss
+    impulse = vel_along_normal * (ONE + bounce_factor[i]) * HALF
+    impulse_x = impulse * nx
+    impulse_y = impulse * ny
+
+    vxs[i] = vx1 - impulse_x
+    vys[i] = vy1 - impulse_y
+    vxs[j] = vx2 + impulse_x
+    vys[j] = vy2 + impulse_y
+
+@njit(cache=True, fastmath=True)
+def find_pairs(xs, ys, radii, alive, cell):
+    """
+    Uniform-grid broad phase: buckets balls into cells with a linked list
+    (head index per cell, next index per ball), then only tests the 3x3 cells around each ball.
+    Balls with alive=False are left out.
+    Returns a (K, 2) int32 array of neighbor pairs (i, j) with i < j.
+    """
+    n = xs.shape[0]
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int32)
+
+    # Grid only needs to span the balls, cell (0, 0) sits at the top-left one
+    min_x = xs.min()
+    min_y = ys.min()
+    cols = int((xs.max() - min_x) // cell) + 1
+    rows = int((ys.max() - min_y) // cell) + 1
+    cell_x = np.empty(n, dtype=np.int32)
+    cell_y = np.empty(n, dtype=np.int32)
+    head = np.full(cols * rows, -1, dtype=np.int32)
+    nxt = np.empty(n, dtype=np.int32)
+
+    # Insert in reverse so every cell lists its balls in ascending index order
+    for i in range(n - 1, -1, -1):
+        if not alive[i]:
+            continue
+        cx = int((xs[i] - min_x) // cell)
+        cy = int((ys[i] - min_y) // cell)
+        cell_x[i] = cx
+        cell_y[i] = cy
+        c = cy * cols + cx
+        nxt[i] = head[c]
+        head[c] = i
+
+    pairs = np.empty((n * (n - 1) // 2, 2), dtype=np.int32)
+    k = 0
+    for i in range(n):
+        if not alive[i]:
+            continue
+        for cy in range(max(cell_y[i] - 1, 0), min(cell_y[i] + 2, rows)):
+            for cx in range(max(cell_x[i] - 1, 0), min(cell_x[i] + 2, cols)):
+                j = head[cy * cols + cx]
+                while j != -1:
+                    if j > i:  # Each pair is visited once
+                        dx = xs[j] - xs[i]
+                        dy = ys[j] - ys[i]
+                        max_distance = radii[i] + radii[j] + max(radii[i], radii[j])
+                        if dx * dx + dy * dy < max_distance * max_distance:
+                            pairs[k, 0] = i
+                            pairs[k, 1] = j
+                            k += 1
+                    j = nxt[j]
+    return pairs[:k].copy()
+
+@njit(cache=True, fastmath=True)
+def resolve_collisions(xs, ys, vxs, vys, radii, bounce_factor, pairs,
+                       table_x, table_y, table_w, table_h, cushion, substeps):
+    """
+    Resolves all ball-ball and ball-wall overlaps for several sub-steps.
+    pairs: (K, 2) int32 array of neighbor indices (i < j).
+    """
+    # Wall limits don't change between sub-steps, compute them once
+    left = table_x + cushion + radii
+    right = table_x + table_w - cushion - radii
+    top = table_y + cushion + radii
+    bottom = table_y + table_h - cushion - radii
+    n_pairs = pairs.shape[0]
+
+    for _ in range(substeps):
+        collide_walls_vec(xs, ys, vxs, vys, left, right, top, bottom)
+        for p in range(n_pairs):
+            _collide_with_ball(xs, ys, vxs, vys, radii, bounce_factor, pairs[p, 0], pairs[p, 1])
+
+def _warm_up():
+    """Compiles (or loads from cache) the kernels at import so the first frame doesn't stall."""
+    coords = np.zeros(2, dtype=np.float32)
+    f32 = np.float32
+    find_pairs(coords, coords, np.ones(2, dtype=np.float32), np.ones(2, dtype=np.bool_), f32(60))
+    resolve_collisions(coords.copy(), coords.copy(), coords.copy(), coords.copy(),
+                       np.ones(2, dtype=np.float32), np.ones(2, dtype=np.float32),
+                       np.array([[0, 1]], dtype=np.int32), f32(0), f32(0), f32(100), f32(100), f32(10), 1)
+
+_warm_up()